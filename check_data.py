@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Quick script to check if mart models have data"""
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google.cloud import bigquery
 import os
 
@@ -10,22 +11,56 @@ client = bigquery.Client(project='customer-labs-478003')
 
 print("Checking data in models...\n")
 
-queries = {
-    "stg_ga4_events": "SELECT COUNT(*) as count FROM `customer-labs-478003.attribution_dev_staging.stg_ga4_events`",
-    "stg_ga4_conversions": "SELECT COUNT(*) as count FROM `customer-labs-478003.attribution_dev_staging.stg_ga4_conversions`",
-    "int_touchpoints": "SELECT COUNT(*) as count FROM `customer-labs-478003.attribution_dev_intermediate.int_touchpoints`",
-    "int_user_journeys": "SELECT COUNT(*) as count FROM `customer-labs-478003.attribution_dev_intermediate.int_user_journeys`",
-    "mart_first_click": "SELECT COUNT(*) as count FROM `customer-labs-478003.attribution_dev_marts.mart_first_click_attribution`",
-    "mart_last_click": "SELECT COUNT(*) as count FROM `customer-labs-478003.attribution_dev_marts.mart_last_click_attribution`",
+PROJECT = "customer-labs-478003"
+
+# Model name -> (dataset, table)
+models = {
+    "stg_ga4_events": ("attribution_dev_staging", "stg_ga4_events"),
+    "stg_ga4_conversions": ("attribution_dev_staging", "stg_ga4_conversions"),
+    "int_touchpoints": ("attribution_dev_intermediate", "int_touchpoints"),
+    "int_user_journeys": ("attribution_dev_intermediate", "int_user_journeys"),
+    "mart_first_click": ("attribution_dev_marts", "mart_first_click_attribution"),
+    "mart_last_click": ("attribution_dev_marts", "mart_last_click_attribution"),
 }
 
-for name, query in queries.items():
-    try:
-        result = client.query(query).result()
-        count = list(result)[0]['count']
-        print(f"✓ {name}: {count:,} rows")
-    except Exception as e:
-        print(f"✗ {name}: ERROR - {str(e)[:100]}")
+job_config = bigquery.QueryJobConfig(use_query_cache=True)
+
+# One metadata-only lookup (zero bytes billed) for every model's row count
+datasets = sorted({dataset for dataset, _ in models.values()})
+metadata_query = "\nUNION ALL\n".join(
+    f"SELECT dataset_id, table_id, type, row_count FROM `{PROJECT}.{dataset}.__TABLES__`"
+    for dataset in datasets
+)
+
+try:
+    metadata = {
+        (row["dataset_id"], row["table_id"]): row
+        for row in client.query(metadata_query, job_config=job_config).result()
+    }
+except Exception as e:
+    print(f"✗ __TABLES__ lookup failed: {str(e)[:100]}")
+    metadata = {}
+
+def count_rows(dataset, table):
+    row = metadata.get((dataset, table))
+    if row is not None and row["type"] == 1:
+        return row["row_count"]
+    # Views (type 2) have no stored row count, so they still need a COUNT(*)
+    query = f"SELECT COUNT(*) as count FROM `{PROJECT}.{dataset}.{table}`"
+    return list(client.query(query, job_config=job_config).result())[0]['count']
+
+# Fire the remaining COUNT(*) queries concurrently; print each as it finishes
+with ThreadPoolExecutor(max_workers=len(models)) as executor:
+    futures = {
+        executor.submit(count_rows, dataset, table): name
+        for name, (dataset, table) in models.items()
+    }
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            print(f"✓ {name}: {future.result():,} rows")
+        except Exception as e:
+            print(f"✗ {name}: ERROR - {str(e)[:100]}")
 
 print("\n" + "="*50)
 print("Checking sample data from mart_first_click_attribution:")
@@ -12,12 +12,15 @@ Usage:
 """
 
 import streamlit as st
-import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import polars as pl
+import pyarrow as pa
 import plotly.express as px
 import plotly.graph_objects as go
 from google.cloud import bigquery
-from datetime import datetime, timedelta
-import time
+from google.cloud import bigquery_storage
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
 
 # Page configuration
 st.set_page_config(
@@ -55,100 +58,97 @@ def get_bigquery_client():
     """Initialize and cache BigQuery client"""
     return bigquery.Client()
 
+@st.cache_resource
+def get_bqstorage_client():
+    """Initialize and cache BigQuery Storage Read API client (Arrow result downloads)"""
+    return bigquery_storage.BigQueryReadClient()
+
+def query_config(*query_parameters):
+    """Build a job config with bound parameters so identical SQL text can hit BigQuery's result cache"""
+    return bigquery.QueryJobConfig(query_parameters=list(query_parameters), use_query_cache=True)
+
 # Data loading functions with caching
+# Loaders return pyarrow Tables straight from the Storage Read API (no Arrow -> pandas object conversion)
 @st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_attribution_summary(_client, project_id, dataset_id):
-    """Load aggregated attribution metrics"""
+def load_attribution_summary(_client, _bqstorage_client, project_id, dataset_id) -> pa.Table:
+    """Load aggregated attribution metrics for both models in a single scan"""
     query = f"""
-    WITH first_click AS (
+    WITH totals AS (
+        -- COALESCE: SUM over an empty mart is NULL, but the summary must read as zero
         SELECT
-            COUNT(DISTINCT conversion_id) as conversions,
-            SUM(conversion_value) as revenue,
-            COUNT(DISTINCT user_pseudo_id) as users
-        FROM `{project_id}.{dataset_id}.mart_first_click_attribution`
-    ),
-    last_click AS (
-        SELECT
-            COUNT(DISTINCT conversion_id) as conversions,
-            SUM(conversion_value) as revenue,
-            COUNT(DISTINCT user_pseudo_id) as users
-        FROM `{project_id}.{dataset_id}.mart_last_click_attribution`
+            COALESCE(SUM(first_click_conversions), 0) as fc_conversions,
+            COALESCE(SUM(first_click_revenue), 0) as fc_revenue,
+            COALESCE(HLL_COUNT.MERGE(first_click_users_sketch), 0) as fc_users,
+            COALESCE(SUM(last_click_conversions), 0) as lc_conversions,
+            COALESCE(SUM(last_click_revenue), 0) as lc_revenue,
+            COALESCE(HLL_COUNT.MERGE(last_click_users_sketch), 0) as lc_users
+        FROM `{project_id}.{dataset_id}.mart_attribution_comparison_daily`
     )
-    SELECT
-        'First-Click' as model,
-        fc.conversions,
-        fc.revenue,
-        fc.users
-    FROM first_click fc
-    UNION ALL
-    SELECT
-        'Last-Click' as model,
-        lc.conversions,
-        lc.revenue,
-        lc.users
-    FROM last_click lc
+    SELECT m.*
+    FROM totals t,
+    UNNEST([
+        STRUCT('First-Click' as model, t.fc_conversions as conversions, t.fc_revenue as revenue, t.fc_users as users),
+        STRUCT('Last-Click' as model, t.lc_conversions as conversions, t.lc_revenue as revenue, t.lc_users as users)
+    ]) m
     """
     
-    return _client.query(query).to_dataframe()
+    return _client.query(query, job_config=query_config()).to_arrow(bqstorage_client=_bqstorage_client)
 
 @st.cache_data(ttl=300)
-def load_time_series(_client, project_id, dataset_id):
-    """Load time series for both attribution models (last 14 days of available data)"""
+def load_latest_conversion_date(_client, project_id, dataset_id):
+    """Load the most recent conversion date (the 14-day window is anchored on available data)"""
+    query = f"""
+    SELECT MAX(conversion_date) as max_date
+    FROM `{project_id}.{dataset_id}.mart_attribution_comparison_daily`
+    """
+    
+    rows = list(_client.query(query, job_config=query_config()).result())
+    return rows[0]["max_date"] if rows else None
+
+@st.cache_data(ttl=300)
+def load_time_series(_client, _bqstorage_client, project_id, dataset_id, cutoff) -> pa.Table:
+    """Load daily totals for both attribution models from `cutoff` onwards (one row per day)"""
+    # A bound literal cutoff (not a subquery) lets BigQuery prune partitions and reuse cached results
     query = f"""
-    WITH latest_date AS (
-        SELECT MAX(conversion_date) as max_date
-        FROM `{project_id}.{dataset_id}.mart_attribution_comparison`
-    )
     SELECT
         conversion_date,
-        channel,
-        first_click_conversions,
-        last_click_conversions,
-        first_click_revenue,
-        last_click_revenue
-    FROM `{project_id}.{dataset_id}.mart_attribution_comparison`
-    WHERE conversion_date >= (SELECT DATE_SUB(max_date, INTERVAL 14 DAY) FROM latest_date)
+        SUM(first_click_conversions) as first_click_conversions,
+        SUM(last_click_conversions) as last_click_conversions,
+        SUM(first_click_revenue) as first_click_revenue,
+        SUM(last_click_revenue) as last_click_revenue
+    FROM `{project_id}.{dataset_id}.mart_attribution_comparison_daily`
+    WHERE conversion_date >= @cutoff
+    GROUP BY conversion_date
     ORDER BY conversion_date
     """
     
-    return _client.query(query).to_dataframe()
+    job_config = query_config(bigquery.ScalarQueryParameter("cutoff", "DATE", cutoff))
+    return _client.query(query, job_config=job_config).to_arrow(bqstorage_client=_bqstorage_client)
 
 @st.cache_data(ttl=300)
-def load_channel_breakdown(_client, project_id, dataset_id):
+def load_channel_breakdown(_client, _bqstorage_client, project_id, dataset_id) -> pa.Table:
     """Load channel-level attribution breakdown"""
     query = f"""
-    WITH first_click AS (
-        SELECT
-            attributed_channel as channel,
-            COUNT(DISTINCT conversion_id) as conversions,
-            SUM(conversion_value) as revenue
-        FROM `{project_id}.{dataset_id}.mart_first_click_attribution`
-        GROUP BY channel
-    ),
-    last_click AS (
-        SELECT
-            attributed_channel as channel,
-            COUNT(DISTINCT conversion_id) as conversions,
-            SUM(conversion_value) as revenue
-        FROM `{project_id}.{dataset_id}.mart_last_click_attribution`
-        GROUP BY channel
-    )
     SELECT
-        COALESCE(f.channel, l.channel) as channel,
-        COALESCE(f.conversions, 0) as first_click_conversions,
-        COALESCE(l.conversions, 0) as last_click_conversions,
-        COALESCE(f.revenue, 0) as first_click_revenue,
-        COALESCE(l.revenue, 0) as last_click_revenue
-    FROM first_click f
-    FULL OUTER JOIN last_click l ON f.channel = l.channel
+        channel,
+        SUM(first_click_conversions) as first_click_conversions,
+        SUM(last_click_conversions) as last_click_conversions,
+        SUM(first_click_revenue) as first_click_revenue,
+        SUM(last_click_revenue) as last_click_revenue
+    FROM `{project_id}.{dataset_id}.mart_attribution_comparison_daily`
+    GROUP BY channel
     ORDER BY last_click_conversions DESC
     """
     
-    return _client.query(query).to_dataframe()
+    return _client.query(query, job_config=query_config()).to_arrow(bqstorage_client=_bqstorage_client)
+
+LIVE_EVENT_LIMIT = 20
+LIVE_REFRESH_SECONDS = 10
 
 @st.cache_data(ttl=5)  # Cache for only 5 seconds - near real-time
-def load_live_events(_client, project_id, staging_dataset_id, limit=20):
-    """Load recent events from staging"""
+def load_live_events(_client, _bqstorage_client, project_id, staging_dataset_id, limit=LIVE_EVENT_LIMIT) -> pa.Table:
+    """Load the most recent events from staging"""
+    # Age is computed in Python: CURRENT_TIMESTAMP() in the SQL would disable the result cache
     query = f"""
     SELECT
         event_id,
@@ -156,17 +156,72 @@ def load_live_events(_client, project_id, staging_dataset_id, limit=20):
         user_pseudo_id,
         event_datetime as event_time,
         traffic_source as source,
-        traffic_medium as medium,
-        TIMESTAMP_DIFF(CURRENT_TIMESTAMP(), event_datetime, SECOND) as seconds_ago
+        traffic_medium as medium
     FROM `{project_id}.{staging_dataset_id}.stg_ga4_events`
     ORDER BY event_datetime DESC
-    LIMIT {limit}
+    LIMIT @limit
     """
     
+    job_config = query_config(bigquery.ScalarQueryParameter("limit", "INT64", limit))
     try:
-        return _client.query(query).to_dataframe()
+        return _client.query(query, job_config=job_config).to_arrow(bqstorage_client=_bqstorage_client)
     except Exception as e:
-        return pd.DataFrame()  # Return empty if streaming table doesn't exist yet
+        return pa.table({})  # Return empty if streaming table doesn't exist yet
+
+def run_loaders_concurrently(loaders):
+    """Run loader callables in parallel so page load waits on the slowest query, not the sum"""
+    # Worker threads need the script context for st.cache_data to work without warnings
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(loaders), initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        futures = {executor.submit(loader): name for name, loader in loaders.items()}
+        return {futures[future]: future.result() for future in as_completed(futures)}
+
+def render_live_events(client, bqstorage_client, project_id, staging_dataset_id):
+    """Render the live event feed (refreshed on its own inside an st.fragment)"""
+    st.header("4. Live Event Feed")
+    
+    live_events_df = pl.from_arrow(load_live_events(client, bqstorage_client, project_id, staging_dataset_id))
+    
+    if not live_events_df.is_empty():
+        live_events_df = live_events_df.with_columns(
+            seconds_ago=(pl.lit(datetime.now(timezone.utc)) - pl.col("event_time")).dt.total_seconds()
+        )
+        
+        # Status indicator
+        most_recent_seconds = live_events_df['seconds_ago'].min()
+        if most_recent_seconds < 60:
+            st.success(f"Live - Last event received {int(most_recent_seconds)} seconds ago")
+        elif most_recent_seconds < 300:
+            st.warning(f"Recent - Last event received {int(most_recent_seconds)} seconds ago")
+        else:
+            st.error(f"Stale - Last event received {int(most_recent_seconds)} seconds ago")
+        
+        # Format for display
+        display_events = live_events_df.select(
+            pl.col('event_time').dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'event_name',
+            'source',
+            'medium',
+            'user_pseudo_id',
+            pl.format("{}s ago", pl.col('seconds_ago').cast(pl.Int64)).alias('seconds_ago')
+        )
+        
+        st.dataframe(
+            display_events,
+            use_container_width=True,
+            height=400,
+            column_config={
+                "event_time": "Timestamp",
+                "event_name": "Event",
+                "source": "Source",
+                "medium": "Medium",
+                "user_pseudo_id": "User ID",
+                "seconds_ago": "Age"
+            }
+        )
+    else:
+        st.info("No live events yet. Run the streaming pipeline to see real-time data.")
+        st.code("python streaming/stream_events.py --project YOUR_PROJECT --dataset attribution_data")
 
 # Main dashboard
 def main():
@@ -191,10 +246,10 @@ def main():
         help="BigQuery dataset containing staging models for live events"
     )
     
-    auto_refresh = st.sidebar.checkbox("Auto-refresh (every 10s)", value=False)
+    auto_refresh = st.sidebar.checkbox("Auto-refresh live feed (every 10s)", value=False)
     
     if auto_refresh:
-        st.sidebar.info("Dashboard will refresh every 10 seconds")
+        st.sidebar.info("Live event feed will refresh every 10 seconds; attribution metrics refresh every 5 minutes")
     
     # Header
     st.markdown('<div class="main-header">Real-time Attribution Dashboard</div>', unsafe_allow_html=True)
@@ -203,6 +258,7 @@ def main():
     # Initialize client
     try:
         client = get_bigquery_client()
+        bqstorage_client = get_bqstorage_client()
     except Exception as e:
         st.error(f"Failed to initialize BigQuery client: {str(e)}")
         st.info("Please ensure Google Cloud credentials are configured correctly.")
@@ -211,10 +267,18 @@ def main():
     # Load data
     try:
         with st.spinner("Loading attribution data..."):
-            summary_df = load_attribution_summary(client, project_id, dataset_id)
-            time_series_df = load_time_series(client, project_id, dataset_id)
-            channel_df = load_channel_breakdown(client, project_id, dataset_id)
-            live_events_df = load_live_events(client, project_id, staging_dataset_id)
+            # Last 14 days of available data; the cutoff only changes when new conversion dates land
+            latest_date = load_latest_conversion_date(client, project_id, dataset_id) or date.today()
+            cutoff = latest_date - timedelta(days=14)
+            
+            results = run_loaders_concurrently({
+                "summary": lambda: load_attribution_summary(client, bqstorage_client, project_id, dataset_id),
+                "time_series": lambda: load_time_series(client, bqstorage_client, project_id, dataset_id, cutoff),
+                "channel": lambda: load_channel_breakdown(client, bqstorage_client, project_id, dataset_id),
+            })
+            summary_df = pl.from_arrow(results["summary"])
+            time_series_df = pl.from_arrow(results["time_series"])
+            channel_df = pl.from_arrow(results["channel"])
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         st.info("Make sure you've run `dbt run` and the dataset/tables exist.")
@@ -225,9 +289,9 @@ def main():
     
     col1, col2, col3, col4 = st.columns(4)
     
-    if not summary_df.empty:
-        fc_data = summary_df[summary_df['model'] == 'First-Click'].iloc[0]
-        lc_data = summary_df[summary_df['model'] == 'Last-Click'].iloc[0]
+    if not summary_df.is_empty():
+        fc_data = summary_df.filter(pl.col('model') == 'First-Click').row(0, named=True)
+        lc_data = summary_df.filter(pl.col('model') == 'Last-Click').row(0, named=True)
         
         with col1:
             st.metric(
@@ -264,27 +328,19 @@ def main():
     # Section 2: Attribution Trends (Last 14 Days of Available Data)
     st.header("2. Attribution Trends (Last 14 Days of Available Data)")
     
-    if not time_series_df.empty:
-        # Aggregate by date
-        daily_agg = time_series_df.groupby('conversion_date').agg({
-            'first_click_conversions': 'sum',
-            'last_click_conversions': 'sum',
-            'first_click_revenue': 'sum',
-            'last_click_revenue': 'sum'
-        }).reset_index()
-        
+    if not time_series_df.is_empty():
         # Conversions time series
         fig_conversions = go.Figure()
         fig_conversions.add_trace(go.Scatter(
-            x=daily_agg['conversion_date'],
-            y=daily_agg['first_click_conversions'],
+            x=time_series_df['conversion_date'].to_numpy(),
+            y=time_series_df['first_click_conversions'].to_numpy(),
             name='First-Click',
             line=dict(color='#636EFA', width=3),
             mode='lines+markers'
         ))
         fig_conversions.add_trace(go.Scatter(
-            x=daily_agg['conversion_date'],
-            y=daily_agg['last_click_conversions'],
+            x=time_series_df['conversion_date'].to_numpy(),
+            y=time_series_df['last_click_conversions'].to_numpy(),
             name='Last-Click',
             line=dict(color='#EF553B', width=3),
             mode='lines+markers'
@@ -301,15 +357,15 @@ def main():
         # Revenue time series
         fig_revenue = go.Figure()
         fig_revenue.add_trace(go.Scatter(
-            x=daily_agg['conversion_date'],
-            y=daily_agg['first_click_revenue'],
+            x=time_series_df['conversion_date'].to_numpy(),
+            y=time_series_df['first_click_revenue'].to_numpy(),
             name='First-Click',
             line=dict(color='#636EFA', width=3),
             mode='lines+markers'
         ))
         fig_revenue.add_trace(go.Scatter(
-            x=daily_agg['conversion_date'],
-            y=daily_agg['last_click_revenue'],
+            x=time_series_df['conversion_date'].to_numpy(),
+            y=time_series_df['last_click_revenue'].to_numpy(),
             name='Last-Click',
             line=dict(color='#EF553B', width=3),
             mode='lines+markers'
@@ -330,7 +386,7 @@ def main():
     # Section 3: Channel Breakdown
     st.header("3. Channel Performance Breakdown")
     
-    if not channel_df.empty:
+    if not channel_df.is_empty():
         col1, col2 = st.columns(2)
         
         with col1:
@@ -359,14 +415,14 @@ def main():
         fig_comparison = go.Figure()
         fig_comparison.add_trace(go.Bar(
             name='First-Click',
-            x=channel_df['channel'],
-            y=channel_df['first_click_conversions'],
+            x=channel_df['channel'].to_numpy(),
+            y=channel_df['first_click_conversions'].to_numpy(),
             marker_color='#636EFA'
         ))
         fig_comparison.add_trace(go.Bar(
             name='Last-Click',
-            x=channel_df['channel'],
-            y=channel_df['last_click_conversions'],
+            x=channel_df['channel'].to_numpy(),
+            y=channel_df['last_click_conversions'].to_numpy(),
             marker_color='#EF553B'
         ))
         fig_comparison.update_layout(
@@ -380,54 +436,23 @@ def main():
         
         # Data table
         st.subheader("Channel Metrics Table")
-        display_df = channel_df.copy()
-        display_df['first_click_revenue'] = display_df['first_click_revenue'].apply(lambda x: f"${x:,.2f}")
-        display_df['last_click_revenue'] = display_df['last_click_revenue'].apply(lambda x: f"${x:,.2f}")
-        st.dataframe(display_df, use_container_width=True)
-    else:
-        st.warning("No channel data available.")
-    
-    st.markdown("---")
-    
-    # Section 4: Live Event Feed
-    st.header("4. Live Event Feed")
-    
-    if not live_events_df.empty:
-        # Status indicator
-        most_recent_seconds = live_events_df['seconds_ago'].min()
-        if most_recent_seconds < 60:
-            st.success(f"Live - Last event received {int(most_recent_seconds)} seconds ago")
-        elif most_recent_seconds < 300:
-            st.warning(f"Recent - Last event received {int(most_recent_seconds)} seconds ago")
-        else:
-            st.error(f"Stale - Last event received {int(most_recent_seconds)} seconds ago")
-        
-        # Format for display
-        display_events = live_events_df[['event_time', 'event_name', 'source', 'medium', 'user_pseudo_id', 'seconds_ago']].copy()
-        display_events['event_time'] = pd.to_datetime(display_events['event_time']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        display_events['seconds_ago'] = display_events['seconds_ago'].apply(lambda x: f"{int(x)}s ago")
-        
+        # Revenue stays numeric; the frontend formats it (no per-row Python callbacks)
         st.dataframe(
-            display_events,
+            channel_df,
             use_container_width=True,
-            height=400,
             column_config={
-                "event_time": "Timestamp",
-                "event_name": "Event",
-                "source": "Source",
-                "medium": "Medium",
-                "user_pseudo_id": "User ID",
-                "seconds_ago": "Age"
+                "first_click_revenue": st.column_config.NumberColumn(format="$%.2f"),
+                "last_click_revenue": st.column_config.NumberColumn(format="$%.2f")
             }
         )
     else:
-        st.info("No live events yet. Run the streaming pipeline to see real-time data.")
-        st.code("python streaming/stream_events.py --project YOUR_PROJECT --dataset attribution_data")
+        st.warning("No channel data available.")
     
-    # Auto-refresh
-    if auto_refresh:
-        time.sleep(10)
-        st.rerun()
+    st.markdown("---")
+    
+    # Section 4: Live Event Feed (only this fragment reruns on the live cadence)
+    live_feed = st.fragment(run_every=LIVE_REFRESH_SECONDS if auto_refresh else None)(render_live_events)
+    live_feed(client, bqstorage_client, project_id, staging_dataset_id)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,73 @@
+/*
+    Mart: Daily Attribution Comparison (single pass)
+    
+    Purpose:
+    - Compute First-Click and Last-Click credit in one scan of the journeys
+    - Conditional aggregation replaces the two mart scans + full outer join
+    - Serve the dashboard summary, time series and channel breakdown
+    
+    Dependencies: int_user_journeys, stg_ga4_conversions
+*/
+
+{{ config(
+    materialized='table',
+    partition_by={'field': 'conversion_date', 'data_type': 'date'},
+    cluster_by=['channel'],
+    tags=['marts', 'attribution', 'comparison']
+) }}
+
+with journeys as (
+    select
+        conversion_id,
+        conversion_date,
+        conversion_value,
+        user_pseudo_id,
+        channel,
+        is_first_touchpoint,
+        is_last_touchpoint
+    from {{ ref('int_user_journeys') }}
+    where is_first_touchpoint = true
+        or is_last_touchpoint = true
+),
+
+-- Direct conversions (no prior touchpoints) credit the conversion channel under both models
+direct_conversions as (
+    select
+        c.conversion_id,
+        c.conversion_date,
+        c.conversion_value,
+        c.user_pseudo_id,
+        c.conversion_channel as channel,
+        true as is_first_touchpoint,
+        true as is_last_touchpoint
+    from {{ ref('stg_ga4_conversions') }} c
+    -- Every journey has exactly one first touchpoint, so this anti-join needs no DISTINCT
+    left join journeys j
+        on c.conversion_id = j.conversion_id
+        and j.is_first_touchpoint = true
+    where j.conversion_id is null
+),
+
+credited as (
+    select * from journeys
+    union all
+    select * from direct_conversions
+)
+
+-- Each conversion has exactly one first and one last touchpoint, so COUNTIF is a distinct count
+select
+    conversion_date,
+    channel,
+    
+    countif(is_first_touchpoint) as first_click_conversions,
+    countif(is_last_touchpoint) as last_click_conversions,
+    sum(if(is_first_touchpoint, conversion_value, 0)) as first_click_revenue,
+    sum(if(is_last_touchpoint, conversion_value, 0)) as last_click_revenue,
+    
+    -- Distinct users as HLL sketches: re-aggregate with HLL_COUNT.MERGE instead of COUNT(DISTINCT).
+    -- HLL_COUNT.INIT skips NULLs, so each sketch only sees users credited under its model
+    hll_count.init(if(is_first_touchpoint, user_pseudo_id, null)) as first_click_users_sketch,
+    hll_count.init(if(is_last_touchpoint, user_pseudo_id, null)) as last_click_users_sketch
+    
+from credited
+group by conversion_date, channel
@@ -6,10 +6,15 @@
     - Aggregate by channel and date
     
     Dependencies: int_user_journeys
+    
+    Materialized as a table: BigQuery materialized views (mv_attribution_daily_*)
+    can only read from base tables.
 */
 
 {{ config(
-    materialized='view',
+    materialized='table',
+    partition_by={'field': 'conversion_date', 'data_type': 'date'},
+    cluster_by=['attributed_channel'],
     tags=['marts', 'attribution']
 ) }}
 
@@ -0,0 +1,28 @@
+/*
+    Materialized View: Daily First-Click Attribution Roll-up
+    
+    Purpose:
+    - Pre-aggregate first-click conversions and revenue by date and channel
+    - Let per-model queries read the roll-up instead of scanning the full mart
+    - The dashboard reads both models from mart_attribution_comparison_daily in one scan
+    
+    Dependencies: mart_first_click_attribution
+*/
+
+{{ config(
+    materialized='materialized_view',
+    partition_by={'field': 'conversion_date', 'data_type': 'date'},
+    cluster_by=['conversion_date', 'attributed_channel'],
+    tags=['marts', 'attribution', 'materialized_view']
+) }}
+
+select
+    conversion_date,
+    attributed_channel,
+    
+    -- conversion_id is unique in the mart, so COUNT(*) equals the distinct count
+    count(*) as conversions,
+    sum(conversion_value) as revenue
+    
+from {{ ref('mart_first_click_attribution') }}
+group by conversion_date, attributed_channel
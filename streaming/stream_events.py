@@ -9,20 +9,202 @@ Usage:
 """
 
 import argparse
-import hashlib
+import io
 import json
-import random
 import time
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xxhash
 from google.cloud import bigquery
-from google.api_core import retry
+from google.cloud import bigquery_storage_v1
+from google.cloud.bigquery_storage_v1 import types, writer
+from google.api_core import exceptions, retry
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+
+JOURNEY_TYPES = ["page_view", "view_item", "add_to_cart", "begin_checkout", "purchase"]
+
+# page_location params depend only on the event name, so every event shares one dict per name
+PAGE_LOCATION_PARAMS = {
+    event_name: {"key": "page_location", "value": {"string_value": f"https://example.com/{event_name}"}}
+    for event_name in JOURNEY_TYPES
+}
+
+# Users generated per vectorized batch in the CLI (bounds memory for large --num-users)
+GENERATION_BATCH_USERS = 1000
+
+EPOCH_DATE = date(1970, 1, 1)
+EPOCH_TIMESTAMP = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+EVENTS_SCHEMA = [
+    bigquery.SchemaField("event_id", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("event_date", "DATE", mode="REQUIRED"),
+    bigquery.SchemaField("event_timestamp", "INTEGER", mode="REQUIRED"),
+    bigquery.SchemaField("event_name", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("user_pseudo_id", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("user_id", "STRING", mode="NULLABLE"),
+    bigquery.SchemaField("event_params", "RECORD", mode="REPEATED", fields=[
+        bigquery.SchemaField("key", "STRING"),
+        bigquery.SchemaField("value", "RECORD", fields=[
+            bigquery.SchemaField("string_value", "STRING"),
+            bigquery.SchemaField("int_value", "INTEGER"),
+            bigquery.SchemaField("float_value", "FLOAT"),
+        ])
+    ]),
+    bigquery.SchemaField("traffic_source", "RECORD", fields=[
+        bigquery.SchemaField("source", "STRING"),
+        bigquery.SchemaField("medium", "STRING"),
+        bigquery.SchemaField("name", "STRING"),
+    ]),
+    bigquery.SchemaField("device", "RECORD", fields=[
+        bigquery.SchemaField("category", "STRING"),
+        bigquery.SchemaField("operating_system", "STRING"),
+        bigquery.SchemaField("browser", "STRING"),
+    ]),
+    bigquery.SchemaField("geo", "RECORD", fields=[
+        bigquery.SchemaField("country", "STRING"),
+        bigquery.SchemaField("region", "STRING"),
+        bigquery.SchemaField("city", "STRING"),
+    ]),
+    bigquery.SchemaField("ecommerce", "RECORD", fields=[
+        bigquery.SchemaField("transaction_id", "STRING"),
+        bigquery.SchemaField("purchase_revenue", "FLOAT"),
+        bigquery.SchemaField("total_item_quantity", "INTEGER"),
+    ]),
+    bigquery.SchemaField("stream_id", "STRING"),
+    bigquery.SchemaField("platform", "STRING"),
+    bigquery.SchemaField("ingestion_timestamp", "TIMESTAMP", mode="REQUIRED"),
+]
+
+# BigQuery column type -> protobuf field type accepted by the Storage Write API
+PROTO_FIELD_TYPES = {
+    "STRING": descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    "INTEGER": descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+    "FLOAT": descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE,
+    "DATE": descriptor_pb2.FieldDescriptorProto.TYPE_INT32,       # Days since epoch
+    "TIMESTAMP": descriptor_pb2.FieldDescriptorProto.TYPE_INT64,  # Microseconds since epoch
+}
+
+PROTO_FIELD_LABELS = {
+    "NULLABLE": descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL,
+    "REQUIRED": descriptor_pb2.FieldDescriptorProto.LABEL_REQUIRED,
+    "REPEATED": descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED,
+}
+
+
+def build_descriptor_proto(name: str, fields: List[bigquery.SchemaField]) -> descriptor_pb2.DescriptorProto:
+    """Build a proto2 message descriptor mirroring a BigQuery schema"""
+    proto = descriptor_pb2.DescriptorProto(name=name)
+    
+    for number, field in enumerate(fields, start=1):
+        proto_field = proto.field.add(
+            name=field.name,
+            number=number,
+            label=PROTO_FIELD_LABELS[field.mode],
+        )
+        if field.field_type == "RECORD":
+            # Nested records become nested message types scoped to the parent
+            nested_name = "".join(part.title() for part in field.name.split("_"))
+            proto.nested_type.append(build_descriptor_proto(nested_name, field.fields))
+            proto_field.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+            proto_field.type_name = nested_name
+        else:
+            proto_field.type = PROTO_FIELD_TYPES[field.field_type]
+    
+    return proto
+
+
+def to_proto_value(field_type: str, value):
+    """Convert a JSON-style event value to its Storage Write API wire representation"""
+    if field_type == "DATE" and isinstance(value, str):
+        return (date.fromisoformat(value) - EPOCH_DATE).days
+    if field_type == "TIMESTAMP" and isinstance(value, str):
+        timestamp = datetime.fromisoformat(value)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return (timestamp - EPOCH_TIMESTAMP) // timedelta(microseconds=1)
+    return value
+
+
+# BigQuery column type -> Arrow type used for Parquet load jobs
+ARROW_FIELD_TYPES = {
+    "STRING": pa.string(),
+    "INTEGER": pa.int64(),
+    "FLOAT": pa.float64(),
+    "DATE": pa.date32(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+}
+
+
+def build_arrow_schema(fields: List[bigquery.SchemaField]) -> List[pa.Field]:
+    """Build Arrow fields mirroring a BigQuery schema"""
+    arrow_fields = []
+    
+    for field in fields:
+        if field.field_type == "RECORD":
+            arrow_type = pa.struct(build_arrow_schema(field.fields))
+        else:
+            arrow_type = ARROW_FIELD_TYPES[field.field_type]
+        if field.mode == "REPEATED":
+            arrow_type = pa.list_(arrow_type)
+        arrow_fields.append(pa.field(field.name, arrow_type, nullable=field.mode != "REQUIRED"))
+    
+    return arrow_fields
+
+
+def to_wire_row(fields: List[bigquery.SchemaField], values: Dict) -> Dict:
+    """Convert DATE/TIMESTAMP strings in an event dict to epoch days/microseconds"""
+    row = {}
+    
+    for field in fields:
+        value = values.get(field.name)
+        if value is None:
+            row[field.name] = None
+        elif field.field_type == "RECORD":
+            if field.mode == "REPEATED":
+                row[field.name] = [to_wire_row(field.fields, item) for item in value]
+            else:
+                row[field.name] = to_wire_row(field.fields, value)
+        elif field.mode == "REPEATED":
+            row[field.name] = [to_proto_value(field.field_type, v) for v in value]
+        else:
+            row[field.name] = to_proto_value(field.field_type, value)
+    
+    return row
+
+
+def populate_message(message, fields: List[bigquery.SchemaField], values: Dict):
+    """Copy a JSON-style event dict into a protobuf row message"""
+    message.SetInParent()
+    
+    for field in fields:
+        value = values.get(field.name)
+        if value is None:
+            continue
+        
+        if field.field_type == "RECORD":
+            if field.mode == "REPEATED":
+                for item in value:
+                    populate_message(getattr(message, field.name).add(), field.fields, item)
+            else:
+                populate_message(getattr(message, field.name), field.fields, value)
+        elif field.mode == "REPEATED":
+            getattr(message, field.name).extend(to_proto_value(field.field_type, v) for v in value)
+        else:
+            setattr(message, field.name, to_proto_value(field.field_type, value))
 
 
 class EventStreamer:
-    """Streams events to BigQuery with deduplication and latency tracking"""
+    """Streams events to BigQuery with deduplication and latency tracking
+    
+    Use as a context manager so the shared append stream (opened on the first
+    append) and the write client's channel are closed on exit.
+    """
     
     def __init__(self, project_id: str, dataset_id: str, table_id: str = "events_streaming"):
         self.client = bigquery.Client(project=project_id)
@@ -31,6 +213,12 @@ class EventStreamer:
         self.table_id = table_id
         self.full_table_id = f"{project_id}.{dataset_id}.{table_id}"
         
+        # Storage Write API: one client (and gRPC channel) shared by every append stream
+        self.write_client = bigquery_storage_v1.BigQueryWriteClient()
+        self.write_stream = f"{self.write_client.table_path(project_id, dataset_id, table_id)}/_default"
+        self.row_message_class, self.row_descriptor = self._build_row_message()
+        self._append_stream = None  # Opened lazily, reused by every append_rows call
+        
         # Event generation configuration
         self.channels = [
             ("google", "cpc", "spring_sale"),
@@ -55,54 +243,61 @@ class EventStreamer:
             {"id": "PROD003", "name": "Tool C", "price": 79.99},
         ]
         
-    def ensure_table_exists(self):
-        """Create the streaming table if it doesn't exist"""
-        schema = [
-            bigquery.SchemaField("event_id", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("event_date", "DATE", mode="REQUIRED"),
-            bigquery.SchemaField("event_timestamp", "INTEGER", mode="REQUIRED"),
-            bigquery.SchemaField("event_name", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("user_pseudo_id", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("user_id", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("event_params", "RECORD", mode="REPEATED", fields=[
-                bigquery.SchemaField("key", "STRING"),
-                bigquery.SchemaField("value", "RECORD", fields=[
-                    bigquery.SchemaField("string_value", "STRING"),
-                    bigquery.SchemaField("int_value", "INTEGER"),
-                    bigquery.SchemaField("float_value", "FLOAT"),
-                ])
-            ]),
-            bigquery.SchemaField("traffic_source", "RECORD", fields=[
-                bigquery.SchemaField("source", "STRING"),
-                bigquery.SchemaField("medium", "STRING"),
-                bigquery.SchemaField("name", "STRING"),
-            ]),
-            bigquery.SchemaField("device", "RECORD", fields=[
-                bigquery.SchemaField("category", "STRING"),
-                bigquery.SchemaField("operating_system", "STRING"),
-                bigquery.SchemaField("browser", "STRING"),
-            ]),
-            bigquery.SchemaField("geo", "RECORD", fields=[
-                bigquery.SchemaField("country", "STRING"),
-                bigquery.SchemaField("region", "STRING"),
-                bigquery.SchemaField("city", "STRING"),
-            ]),
-            bigquery.SchemaField("ecommerce", "RECORD", fields=[
-                bigquery.SchemaField("transaction_id", "STRING"),
-                bigquery.SchemaField("purchase_revenue", "FLOAT"),
-                bigquery.SchemaField("total_item_quantity", "INTEGER"),
-            ]),
-            bigquery.SchemaField("stream_id", "STRING"),
-            bigquery.SchemaField("platform", "STRING"),
-            bigquery.SchemaField("ingestion_timestamp", "TIMESTAMP", mode="REQUIRED"),
+        # traffic_source dicts are shared by every journey on the same channel
+        self.traffic_sources = [
+            {"source": source, "medium": medium, "name": campaign}
+            for source, medium, campaign in self.channels
         ]
         
-        table = bigquery.Table(self.full_table_id, schema=schema)
+        # Value pools as arrays so generation can draw a whole batch per field in one call
+        self.rng = np.random.default_rng()
+        self.product_prices = np.array([product["price"] for product in self.products])
+        self.device_categories = np.array(["mobile", "desktop", "tablet"])
+        self.operating_systems = np.array(["iOS", "Android", "Windows", "macOS"])
+        self.browsers = np.array(["Chrome", "Safari", "Firefox", "Edge"])
+        self.countries = np.array(["US", "UK", "CA", "AU"])
+        self.regions = np.array(["California", "New York", "London", "Ontario"])
+        self.cities = np.array(["San Francisco", "New York", "London", "Toronto"])
+        
+    def __enter__(self):
+        # The append stream is opened lazily by append_rows; load mode never needs it
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Close the append stream and release the write client's gRPC channel"""
+        self._close_append_stream()
+        self.write_client.transport.close()
+    
+    def _get_append_stream(self) -> writer.AppendRowsStream:
+        """Return the shared bidi append stream, opening it on first use"""
+        if self._append_stream is None:
+            # Template carries the stream name and writer schema; it is sent once per connection
+            request_template = types.AppendRowsRequest()
+            request_template.write_stream = self.write_stream
+            proto_data = types.AppendRowsRequest.ProtoData()
+            proto_data.writer_schema = types.ProtoSchema(proto_descriptor=self.row_descriptor)
+            request_template.proto_rows = proto_data
+            
+            self._append_stream = writer.AppendRowsStream(self.write_client, request_template)
+        return self._append_stream
+    
+    def _close_append_stream(self):
+        if self._append_stream is not None:
+            self._append_stream.close()
+            self._append_stream = None
+    
+    def ensure_table_exists(self):
+        """Create the streaming table if it doesn't exist"""
+        table = bigquery.Table(self.full_table_id, schema=EVENTS_SCHEMA)
         table.time_partitioning = bigquery.TimePartitioning(
             type_=bigquery.TimePartitioningType.DAY,
             field="event_date"
         )
-        table.clustering_fields = ["event_name", "user_pseudo_id"]
+        # Recent-event lookups order by ingestion time, so cluster on it first
+        table.clustering_fields = ["ingestion_timestamp", "event_name"]
         
         try:
             table = self.client.create_table(table)
@@ -113,114 +308,230 @@ class EventStreamer:
             else:
                 raise
     
+    def _build_row_message(self):
+        """Compile the protobuf row message used to serialize events"""
+        # No package: the backend decodes proto_descriptor on its own, so nested
+        # type names must resolve without any enclosing file scope
+        file_proto = descriptor_pb2.FileDescriptorProto(
+            name=f"{self.table_id}_row.proto",
+            syntax="proto2",
+        )
+        file_proto.message_type.append(build_descriptor_proto("EventRow", EVENTS_SCHEMA))
+        
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(file_proto)
+        message_descriptor = pool.FindMessageTypeByName("EventRow")
+        message_class = message_factory.GetMessageClass(message_descriptor)
+        
+        # Self-contained copy for ProtoSchema: nested records are nested_type entries of EventRow
+        row_descriptor = descriptor_pb2.DescriptorProto()
+        message_descriptor.CopyToProto(row_descriptor)
+        return message_class, row_descriptor
+    
+    def serialize_event(self, event: Dict) -> bytes:
+        """Serialize a single event into a protobuf row"""
+        row = self.row_message_class()
+        populate_message(row, EVENTS_SCHEMA, event)
+        return row.SerializeToString()
+    
     def generate_event_id(self, user_id: str, event_name: str, timestamp: int) -> str:
         """Generate deterministic event ID for deduplication"""
-        unique_string = f"{user_id}-{event_name}-{timestamp}"
-        return hashlib.sha256(unique_string.encode()).hexdigest()[:16]
+        # Non-cryptographic: the ID is only a dedup key, so xxh3 beats SHA-256 by an order of magnitude
+        key = f"{user_id}|{event_name}|{timestamp}".encode()
+        return xxhash.xxh3_128_hexdigest(key)[:16]
     
     def generate_user_journey(self, user_id: str, num_events: int = 5) -> List[Dict]:
         """Generate a realistic user journey"""
-        events = []
-        base_time = datetime.utcnow() - timedelta(minutes=random.randint(1, 60))
+        return self.generate_batch([user_id], num_events)[0]
+    
+    def generate_batch(self, user_ids: List[str], events_per_user: int = 5) -> List[List[Dict]]:
+        """Generate one journey per user, drawing each random field for the whole batch at once"""
+        journey_types = JOURNEY_TYPES[:events_per_user]
+        num_users, num_events = len(user_ids), len(journey_types)
+        shape = (num_users, num_events)
+        rng = self.rng
         
-        # Pick a channel for this journey
-        source, medium, campaign = random.choice(self.channels)
+        # Ingestion time is the stream time of the batch, so format it once rather than per event
+        now = datetime.now(timezone.utc)
+        ingestion_timestamp = now.isoformat()
         
-        # Session ID
-        session_id = random.randint(1000000, 9999999)
-        session_number = random.randint(1, 10)
+        # Per-journey fields: start time, channel, session, device and geo (a user keeps one device/location)
+        now_us = (now - EPOCH_TIMESTAMP) // timedelta(microseconds=1)
+        base_us = now_us - rng.integers(1, 61, size=num_users) * 60_000_000
+        channel_indices = rng.integers(0, len(self.channels), size=num_users).tolist()
+        session_ids = rng.integers(1000000, 10000000, size=num_users).tolist()
+        session_numbers = rng.integers(1, 11, size=num_users).tolist()
+        device_categories = rng.choice(self.device_categories, size=num_users).tolist()
+        operating_systems = rng.choice(self.operating_systems, size=num_users).tolist()
+        browsers = rng.choice(self.browsers, size=num_users).tolist()
+        countries = rng.choice(self.countries, size=num_users).tolist()
+        regions = rng.choice(self.regions, size=num_users).tolist()
+        cities = rng.choice(self.cities, size=num_users).tolist()
         
-        # Generate journey events
-        journey_types = ["page_view", "view_item", "add_to_cart", "begin_checkout", "purchase"]
-        for i, event_name in enumerate(journey_types[:num_events]):
-            event_time = base_time + timedelta(seconds=i * random.randint(30, 300))
-            event_timestamp = int(event_time.timestamp() * 1_000_000)  # Microseconds
-            
-            event = {
-                "event_id": self.generate_event_id(user_id, event_name, event_timestamp),
-                "event_date": event_time.date().isoformat(),
-                "event_timestamp": event_timestamp,
-                "event_name": event_name,
-                "user_pseudo_id": user_id,
-                "user_id": None,
-                "event_params": [
-                    {"key": "ga_session_id", "value": {"int_value": session_id}},
-                    {"key": "ga_session_number", "value": {"int_value": session_number}},
-                    {"key": "page_location", "value": {"string_value": f"https://example.com/{event_name}"}},
-                    {"key": "engagement_time_msec", "value": {"int_value": random.randint(1000, 30000)}},
-                ],
-                "traffic_source": {
-                    "source": source,
-                    "medium": medium,
-                    "name": campaign,
-                },
-                "device": {
-                    "category": random.choice(["mobile", "desktop", "tablet"]),
-                    "operating_system": random.choice(["iOS", "Android", "Windows", "macOS"]),
-                    "browser": random.choice(["Chrome", "Safari", "Firefox", "Edge"]),
-                },
-                "geo": {
-                    "country": random.choice(["US", "UK", "CA", "AU"]),
-                    "region": random.choice(["California", "New York", "London", "Ontario"]),
-                    "city": random.choice(["San Francisco", "New York", "London", "Toronto"]),
-                },
-                "stream_id": "web_stream_001",
-                "platform": "WEB",
-                "ingestion_timestamp": datetime.utcnow().isoformat(),
+        # Per-event fields
+        step_us = rng.integers(30, 301, size=shape) * 1_000_000
+        timestamps = base_us[:, None] + np.arange(num_events) * step_us  # Microseconds
+        event_dates = timestamps.astype("datetime64[us]").astype("datetime64[D]").astype(str).tolist()
+        timestamps = timestamps.tolist()
+        engagement_msec = rng.integers(1000, 30001, size=shape).tolist()
+        
+        # Ecommerce fields (only used for purchase events)
+        product_indices = rng.integers(0, len(self.products), size=shape)
+        quantities = rng.integers(1, 4, size=shape)
+        revenues = (self.product_prices[product_indices] * quantities).tolist()
+        quantities = quantities.tolist()
+        
+        journeys = []
+        for u, user_id in enumerate(user_ids):
+            # Sub-dicts that are constant for the journey are built once and shared by its events
+            traffic_source = self.traffic_sources[channel_indices[u]]
+            device = {
+                "category": device_categories[u],
+                "operating_system": operating_systems[u],
+                "browser": browsers[u],
             }
+            geo = {
+                "country": countries[u],
+                "region": regions[u],
+                "city": cities[u],
+            }
+            session_id_param = {"key": "ga_session_id", "value": {"int_value": session_ids[u]}}
+            session_number_param = {"key": "ga_session_number", "value": {"int_value": session_numbers[u]}}
+            events = []
             
-            # Add ecommerce data for purchase events
-            if event_name == "purchase":
-                product = random.choice(self.products)
-                quantity = random.randint(1, 3)
-                event["ecommerce"] = {
-                    "transaction_id": str(uuid.uuid4())[:8],
-                    "purchase_revenue": product["price"] * quantity,
-                    "total_item_quantity": quantity,
+            for i, event_name in enumerate(journey_types):
+                event_timestamp = timestamps[u][i]
+                
+                event = {
+                    "event_id": self.generate_event_id(user_id, event_name, event_timestamp),
+                    "event_date": event_dates[u][i],
+                    "event_timestamp": event_timestamp,
+                    "event_name": event_name,
+                    "user_pseudo_id": user_id,
+                    "user_id": None,
+                    "event_params": [
+                        session_id_param,
+                        session_number_param,
+                        PAGE_LOCATION_PARAMS[event_name],
+                        {"key": "engagement_time_msec", "value": {"int_value": engagement_msec[u][i]}},
+                    ],
+                    "traffic_source": traffic_source,
+                    "device": device,
+                    "geo": geo,
+                    "stream_id": "web_stream_001",
+                    "platform": "WEB",
+                    "ingestion_timestamp": ingestion_timestamp,
                 }
+                
+                # Add ecommerce data for purchase events
+                if event_name == "purchase":
+                    event["ecommerce"] = {
+                        "transaction_id": str(uuid.uuid4())[:8],
+                        "purchase_revenue": revenues[u][i],
+                        "total_item_quantity": quantities[u][i],
+                    }
+                
+                events.append(event)
             
-            events.append(event)
+            journeys.append(events)
         
-        return events
+        return journeys
     
-    @retry.Retry(deadline=30)
     def stream_events(self, events: List[Dict]) -> Dict:
-        """Stream events to BigQuery with retry logic"""
+        """Stream events to BigQuery via the Storage Write API default stream"""
+        return self.append_rows([self.serialize_event(event) for event in events])
+    
+    @retry.Retry(deadline=30)
+    def append_rows(self, serialized_rows: List[bytes]) -> Dict:
+        """Send pre-serialized protobuf rows in a single AppendRows request on the shared stream"""
         start_time = time.time()
         
-        # Use insertId for BigQuery's built-in deduplication (1-minute window)
-        rows_to_insert = []
-        for event in events:
-            row = (event, event["event_id"])  # (row_data, insert_id)
-            rows_to_insert.append(row)
+        proto_rows = types.ProtoRows()
+        proto_rows.serialized_rows.extend(serialized_rows)
+        request = types.AppendRowsRequest()
+        request.proto_rows = types.AppendRowsRequest.ProtoData(rows=proto_rows)
         
-        errors = self.client.insert_rows_json(
-            self.full_table_id,
-            [r[0] for r in rows_to_insert],
-            row_ids=[r[1] for r in rows_to_insert]
-        )
+        try:
+            self._get_append_stream().send(request).result()
+        except exceptions.GoogleAPICallError as e:
+            # A failed stream cannot be reused; drop it so the retry reopens a fresh one
+            self._close_append_stream()
+            if retry.if_transient_error(e):
+                raise
+            # Row and schema errors fail the whole request and surface as the future's exception
+            latency = time.time() - start_time
+            print(f"Errors inserting rows: {e.message}")
+            return {"success": False, "errors": [e.message], "latency_seconds": latency}
+        except Exception:
+            self._close_append_stream()
+            raise
         
         latency = time.time() - start_time
+        print(f"Successfully streamed {len(serialized_rows)} events (latency: {latency:.2f}s)")
+        return {"success": True, "rows_inserted": len(serialized_rows), "latency_seconds": latency}
+    
+    def load_events(self, event_batches: Iterable[List[Dict]]) -> Dict:
+        """Bulk-load events through a free batch load job from an in-memory Parquet buffer"""
+        start_time = time.time()
         
-        if errors:
-            print(f"Errors inserting rows: {errors}")
-            return {"success": False, "errors": errors, "latency_seconds": latency}
-        else:
-            print(f"Successfully streamed {len(events)} events (latency: {latency:.2f}s)")
-            return {"success": True, "rows_inserted": len(events), "latency_seconds": latency}
+        # One row group per batch: only the current batch and the compressed buffer are held in memory
+        arrow_schema = pa.schema(build_arrow_schema(EVENTS_SCHEMA))
+        buffer = io.BytesIO()
+        rows_written = 0
+        with pq.ParquetWriter(buffer, arrow_schema) as parquet_writer:
+            for events in event_batches:
+                if not events:
+                    continue
+                parquet_writer.write_table(pa.Table.from_pylist(
+                    [to_wire_row(EVENTS_SCHEMA, event) for event in events], schema=arrow_schema
+                ))
+                rows_written += len(events)
+        
+        if not rows_written:
+            return {"success": True, "rows_inserted": 0, "latency_seconds": 0.0, "requests": 0}
+        buffer.seek(0)
+        
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        # Map Parquet LIST groups to REPEATED columns (event_params)
+        job_config.parquet_options = bigquery.ParquetOptions()
+        job_config.parquet_options.enable_list_inference = True
+        
+        load_job = self.client.load_table_from_file(buffer, self.full_table_id, job_config=job_config)
+        try:
+            load_job.result()
+        except Exception as e:
+            latency = time.time() - start_time
+            print(f"Errors loading rows: {load_job.errors or e}")
+            return {"success": False, "errors": load_job.errors or [str(e)], "latency_seconds": latency}
+        
+        latency = time.time() - start_time
+        print(f"Successfully loaded {load_job.output_rows} events (latency: {latency:.2f}s)")
+        return {"success": True, "rows_inserted": load_job.output_rows, "latency_seconds": latency, "requests": 1}
     
-    def verify_deduplication(self, event_id: str) -> bool:
-        """Verify that duplicate events are not inserted"""
+    def count_physical_copies(self, event_id: str, event_date: str) -> int:
+        """Count the physical rows stored for an event
+        
+        The Storage Write API default stream is at-least-once, so a replay writes
+        another physical row with the same deterministic event_id. This reports
+        the copies; it does not verify write-side deduplication.
+        """
+        # Bound parameters: no SQL injection via event_id, and the event_date predicate prunes to one partition
         query = f"""
-            SELECT COUNT(*) as count
+            SELECT COUNT(*) as physical_copies
             FROM `{self.full_table_id}`
-            WHERE event_id = '{event_id}'
+            WHERE event_id = @event_id
+                AND event_date = @event_date
         """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("event_id", "STRING", event_id),
+            bigquery.ScalarQueryParameter("event_date", "DATE", event_date),
+        ])
         
-        result = list(self.client.query(query).result())
-        count = result[0].count
-        
-        return count == 1
+        row = list(self.client.query(query, job_config=job_config).result())[0]
+        return row.physical_copies
     
     def get_recent_events(self, limit: int = 20) -> List[Dict]:
         """Query recent streamed events"""
@@ -234,6 +545,11 @@ class EventStreamer:
                 traffic_source.medium as medium,
                 ingestion_timestamp
             FROM `{self.full_table_id}`
+            -- Partition + cluster pruning: only scan the last day's partitions and recent blocks
+            WHERE event_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)
+                AND ingestion_timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 10 MINUTE)
+            -- Dedup on read: the at-least-once default stream can hold replayed copies
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY event_id ORDER BY ingestion_timestamp) = 1
             ORDER BY ingestion_timestamp DESC
             LIMIT {limit}
         """
@@ -242,6 +558,93 @@ class EventStreamer:
         return [dict(row) for row in results]
 
 
+class BatchBuffer:
+    """Accumulates serialized events and flushes them as size-bounded AppendRows requests"""
+    
+    def __init__(
+        self,
+        streamer: EventStreamer,
+        max_rows: int = 500,
+        max_bytes: int = 5 * 1024 * 1024,
+        max_wait_seconds: float = 5.0,
+    ):
+        self.streamer = streamer
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes  # Stay well under the 10 MB AppendRows request limit
+        self.max_wait_seconds = max_wait_seconds
+        
+        self.rows: List[bytes] = []
+        self.num_bytes = 0
+        self.first_added_at = None
+        self.results: List[Dict] = []
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def add(self, event: Dict):
+        """Serialize an event into the buffer, flushing when a threshold is hit"""
+        row = self.streamer.serialize_event(event)
+        if not self.rows:
+            self.first_added_at = time.time()
+        self.rows.append(row)
+        self.num_bytes += len(row)
+        
+        if self.should_flush():
+            self.flush()
+    
+    def should_flush(self) -> bool:
+        """Check the row count, byte size and age thresholds"""
+        if not self.rows:
+            return False
+        return (
+            len(self.rows) >= self.max_rows
+            or self.num_bytes >= self.max_bytes
+            or time.time() - self.first_added_at >= self.max_wait_seconds
+        )
+    
+    def flush(self) -> Dict:
+        """Append all buffered rows in one request"""
+        if not self.rows:
+            return None
+        
+        result = self.streamer.append_rows(self.rows)
+        self.results.append(result)
+        
+        self.rows = []
+        self.num_bytes = 0
+        self.first_added_at = None
+        return result
+    
+    def summary(self) -> Dict:
+        """Combine the results of every flush into a single stream result"""
+        errors = [error for result in self.results for error in result.get("errors", [])]
+        return {
+            "success": all(result["success"] for result in self.results),
+            "rows_inserted": sum(result.get("rows_inserted", 0) for result in self.results),
+            "latency_seconds": sum(result["latency_seconds"] for result in self.results),
+            "requests": len(self.results),
+            "errors": errors,
+        }
+
+
+def iter_user_event_batches(streamer: EventStreamer, num_users: int, events_per_user: int):
+    """Yield the events of each vectorized generation batch of simulated user journeys"""
+    for batch_start in range(0, num_users, GENERATION_BATCH_USERS):
+        batch_size = min(GENERATION_BATCH_USERS, num_users - batch_start)
+        user_ids = [f"user_{uuid.uuid4().hex[:8]}" for _ in range(batch_size)]
+        journeys = streamer.generate_batch(user_ids, events_per_user)
+        
+        for offset, (user_id, events) in enumerate(zip(user_ids, journeys)):
+            print(f"  → User {batch_start + offset + 1}: {user_id} - {len(events)} events")
+        yield [event for events in journeys for event in events]
+
+
+def iter_user_events(streamer: EventStreamer, num_users: int, events_per_user: int):
+    """Yield events for each simulated user journey, generated in vectorized batches"""
+    for events in iter_user_event_batches(streamer, num_users, events_per_user):
+        yield from events
+
+
 def main():
     parser = argparse.ArgumentParser(description="Stream GA4-like events to BigQuery")
     parser.add_argument("--project", required=True, help="GCP project ID")
@@ -249,7 +652,13 @@ def main():
     parser.add_argument("--table", default="events_streaming", help="BigQuery table")
     parser.add_argument("--num-users", type=int, default=3, help="Number of users to simulate")
     parser.add_argument("--events-per-user", type=int, default=5, help="Events per user journey")
-    parser.add_argument("--test-dedup", action="store_true", help="Test deduplication by sending duplicates")
+    parser.add_argument("--test-dedup", action="store_true", help="Re-send an event and report how many physical copies are stored")
+    parser.add_argument(
+        "--mode",
+        choices=["stream", "load"],
+        default="stream",
+        help="stream: near-real-time Storage Write API; load: one batch Parquet load job (bulk runs)",
+    )
     
     args = parser.parse_args()
     
@@ -257,54 +666,69 @@ def main():
     print("Real-time Attribution Pipeline - Event Streaming Demo")
     print(f"{'='*60}\n")
     
-    # Initialize streamer
-    streamer = EventStreamer(args.project, args.dataset, args.table)
-    
-    # Ensure table exists
-    print("Setting up BigQuery table...")
-    streamer.ensure_table_exists()
-    
-    # Generate and stream events
-    print(f"\nGenerating {args.num_users} user journeys...")
-    all_events = []
-    
-    for i in range(args.num_users):
-        user_id = f"user_{uuid.uuid4().hex[:8]}"
-        events = streamer.generate_user_journey(user_id, args.events_per_user)
-        all_events.extend(events)
-        print(f"  → User {i+1}: {user_id} - {len(events)} events")
-    
-    print(f"\nStreaming {len(all_events)} events to BigQuery...")
-    result = streamer.stream_events(all_events)
-    
-    if result["success"]:
-        print(f"\nStream completed successfully!")
-        print(f"   • Events inserted: {result['rows_inserted']}")
-        print(f"   • Latency: {result['latency_seconds']:.2f} seconds")
-        print(f"   • Avg latency per event: {result['latency_seconds']/len(all_events):.3f}s")
-    
-    # Test deduplication if requested
-    if args.test_dedup and all_events:
-        print(f"\nTesting deduplication...")
-        test_event = all_events[0]
-        print(f"   • Re-streaming first event: {test_event['event_id']}")
+    # Initialize streamer (closes the shared append stream on exit)
+    with EventStreamer(args.project, args.dataset, args.table) as streamer:
+        # Ensure table exists
+        print("Setting up BigQuery table...")
+        streamer.ensure_table_exists()
         
-        streamer.stream_events([test_event])
-        time.sleep(2)  # Wait for data to be queryable
-        
-        is_unique = streamer.verify_deduplication(test_event['event_id'])
-        if is_unique:
-            print(f"   Deduplication working: Only 1 copy of event exists")
+        if args.mode == "load":
+            # Bulk runs only need eventual consistency: one load job instead of streaming appends
+            print(f"\nGenerating and loading {args.num_users} user journeys to BigQuery...")
+            first_event = None
+            total_events = 0
+            
+            def counted_batches():
+                nonlocal first_event, total_events
+                for events in iter_user_event_batches(streamer, args.num_users, args.events_per_user):
+                    if first_event is None and events:
+                        first_event = events[0]
+                    total_events += len(events)
+                    yield events
+            
+            result = streamer.load_events(counted_batches())
         else:
-            print(f"   Deduplication failed: Multiple copies found")
-    
-    # Show recent events
-    print(f"\nRecent streamed events (last 10):")
-    print(f"{'='*80}")
-    recent = streamer.get_recent_events(limit=10)
-    for event in recent:
-        print(f"   {event['event_time']} | {event['event_name']:20s} | {event['source']:15s} | {event['user_pseudo_id']}")
-    
+            # Generate and stream events
+            print(f"\nGenerating and streaming {args.num_users} user journeys to BigQuery...")
+            buffer = BatchBuffer(streamer)
+            first_event = None
+            total_events = 0
+            
+            for event in iter_user_events(streamer, args.num_users, args.events_per_user):
+                if first_event is None:
+                    first_event = event
+                buffer.add(event)
+                total_events += 1
+            buffer.flush()
+            result = buffer.summary()
+        
+        if result["success"] and total_events:
+            completed, requests_label = ("Load", "Load jobs") if args.mode == "load" else ("Stream", "Append requests")
+            print(f"\n{completed} completed successfully!")
+            print(f"   • Events inserted: {result['rows_inserted']}")
+            print(f"   • {requests_label}: {result['requests']}")
+            print(f"   • Latency: {result['latency_seconds']:.2f} seconds")
+            print(f"   • Avg latency per event: {result['latency_seconds']/total_events:.3f}s")
+        
+        # Replay an event if requested
+        if args.test_dedup and first_event:
+            print(f"\nReplaying an event...")
+            test_event = first_event
+            print(f"   • Re-streaming first event: {test_event['event_id']}")
+            
+            streamer.stream_events([test_event])
+            time.sleep(2)  # Wait for data to be queryable
+            
+            copies = streamer.count_physical_copies(test_event['event_id'], test_event['event_date'])
+            print(f"   • Physical copies stored: {copies} (default stream is at-least-once; readers keep one row per event_id)")
+        
+        # Show recent events
+        print(f"\nRecent streamed events (last 10):")
+        print(f"{'='*80}")
+        recent = streamer.get_recent_events(limit=10)
+        for event in recent:
+            print(f"   {event['event_time']} | {event['event_name']:20s} | {event['source']:15s} | {event['user_pseudo_id']}")
+        
     print(f"\n{'='*60}")
     print("Streaming demo completed successfully!")
     print(f"{'='*60}\n")